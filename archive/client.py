@@ -23,12 +23,10 @@ def write_message(history_file: str, message: dict):  # append a JSON message to
 # Summary: Continuously watch `history_file` for new lines and call `on_message` for each parsed message
 def tail_history(history_file: str, stop_event: threading.Event, on_message, poll: float = 0.5):  # watch file for new lines
     # Simple tail implementation: seek to end and periodically read new lines
-    with open(history_file, "r", encoding="utf-8") as f:  # open for read
+    with open(history_file, "rb") as f:  # open for binary read; json parses UTF-8 bytes directly
         f.seek(0, os.SEEK_END)  # move to the end of file so we only see new lines
         while not stop_event.is_set():  # loop until told to stop
             line = f.readline()  # try to read a line
-            print("Read line from the file :")
-            print(line)
             if not line:  # no new line yet
                 time.sleep(poll)  # wait a bit before checking again
                 continue
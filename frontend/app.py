@@ -43,6 +43,13 @@ st.markdown("---")
 # API Configuration
 API_URL = "http://localhost:8000/chat"
 
+
+@st.cache_resource
+def get_http_session():
+    """One keep-alive session per server process, shared across Streamlit reruns."""
+    return requests.Session()
+
+
 # Initialize session state for messages
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -65,7 +72,7 @@ if prompt := st.chat_input("What is on your mind?"):
         message_placeholder.markdown("*Thinking...*")
         
         try:
-            response = requests.post(API_URL, json={"prompt": prompt})
+            response = get_http_session().post(API_URL, json={"prompt": prompt})
             if response.status_code == 200:
                 full_response = response.json()["response"]
                 message_placeholder.markdown(full_response)
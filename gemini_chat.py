@@ -5,11 +5,17 @@ function-calling support.
 
 Usage:
     python gemini_chat.py
+
+Set GEMINI_CHAT_VERBOSE=1 to print each User/Agent/Gemini/Tool step.
+Replies are streamed as they are generated; set GEMINI_CHAT_STREAM=0 to print
+each reply only once it is complete.
 """
 from __future__ import annotations
 
 import os
+import time
 from datetime import datetime
+from typing import Callable, Optional
 
 from dotenv import load_dotenv
 from google import genai
@@ -28,6 +34,17 @@ if not API_KEY:
 
 client = genai.Client(api_key=API_KEY)
 
+# Step-by-step tracing of the agent loop (off unless GEMINI_CHAT_VERBOSE is set)
+VERBOSE = os.getenv("GEMINI_CHAT_VERBOSE", "") not in ("", "0")
+# Print reply text as it arrives instead of waiting for the whole response
+STREAM = os.getenv("GEMINI_CHAT_STREAM", "1") not in ("", "0")
+
+
+def trace(*lines: str) -> None:
+    """Print agent-loop diagnostics when VERBOSE is enabled."""
+    if VERBOSE:
+        print("\n".join(lines))
+
 # ---------------------------------------------------------------------------
 # Model name
 # ---------------------------------------------------------------------------
@@ -37,16 +54,23 @@ MODEL_NAME = "gemini-3-flash-preview"
 # Tool implementation  (local Python function)
 # ---------------------------------------------------------------------------
 
+_datetime_cache: tuple[int, dict] = (-1, {})  # (epoch second, result for that second)
+
+
 def get_current_datetime() -> dict:
     """Return the current local datetime as a structured dict."""
-    now = datetime.now()
-    return {
-        "date":        now.strftime("%Y-%m-%d"),
-        "time":        now.strftime("%H:%M:%S"),
-        "datetime":    now.strftime("%Y-%m-%d %H:%M:%S"),
-        "day_of_week": now.strftime("%A"),
-        "timezone":    "local",
-    }
+    global _datetime_cache
+    sec = int(time.time())
+    if _datetime_cache[0] != sec:  # the result only has one-second resolution
+        now = datetime.fromtimestamp(sec)
+        _datetime_cache = (sec, {
+            "date":        now.strftime("%Y-%m-%d"),
+            "time":        now.strftime("%H:%M:%S"),
+            "datetime":    now.strftime("%Y-%m-%d %H:%M:%S"),
+            "day_of_week": now.strftime("%A"),
+            "timezone":    "local",
+        })
+    return _datetime_cache[1]
 
 
 # Map tool names → callables so we can dispatch by name
@@ -97,12 +121,19 @@ def handle_function_calls(response) -> list[types.Part]:
     result_parts: list[types.Part] = []
 
     # Gemini API → Agent: inspect each part of the model's response for tool call requests
-    print("\n" + "-" * 50)
-    print("[STEP 2] Gemini API → Agent")
-    print("         Gemini has replied. Agent is now checking")
-    print("         if Gemini wants to call a tool...")
+    trace(
+        "\n" + "-" * 50,
+        "[STEP 2] Gemini API → Agent",
+        "         Gemini has replied. Agent is now checking",
+        "         if Gemini wants to call a tool...",
+    )
 
-    for part in response.candidates[0].content.parts:
+    # Most turns are plain text: skip the dispatch loop unless some part asks for a tool
+    parts = response.candidates[0].content.parts or []
+    if not any(part.function_call for part in parts):
+        return result_parts
+
+    for part in parts:
         # Agent decides: does this part contain a tool call request from Gemini?
         if not part.function_call:
             continue
@@ -111,28 +142,38 @@ def handle_function_calls(response) -> list[types.Part]:
         fn_args = dict(part.function_call.args) if part.function_call.args else {}
 
         # Gemini API → Agent: model has decided to call a tool; agent reads the request
-        print(f"\n[STEP 3] Gemini API → Agent (Tool Request)")
-        print(f"         Gemini says: 'Please call the tool: {fn_name}'")
-        print(f"         Arguments Gemini passed: {fn_args}")
+        trace(
+            f"\n[STEP 3] Gemini API → Agent (Tool Request)",
+            f"         Gemini says: 'Please call the tool: {fn_name}'",
+            f"         Arguments Gemini passed: {fn_args}",
+        )
 
         # Agent → Tool: agent dispatches the tool call locally
-        print(f"\n[STEP 4] Agent → Tool")
-        print(f"         Agent is now running the local function: {fn_name}()")
+        trace(
+            f"\n[STEP 4] Agent → Tool",
+            f"         Agent is now running the local function: {fn_name}()",
+        )
 
         if fn_name in TOOL_REGISTRY:
             output = TOOL_REGISTRY[fn_name](**fn_args)   # Agent → Tool: execute tool
             # Tool → Agent: tool returns result
-            print(f"\n[STEP 5] Tool → Agent")
-            print(f"         Tool '{fn_name}' finished and returned the result:")
-            print(f"         {output}")
+            trace(
+                f"\n[STEP 5] Tool → Agent",
+                f"         Tool '{fn_name}' finished and returned the result:",
+                f"         {output}",
+            )
         else:
             output = {"error": f"Unknown tool: {fn_name}"}
-            print(f"\n[STEP 5] Tool → Agent (ERROR)")
-            print(f"         Tool '{fn_name}' not found! Error: {output}")
+            trace(
+                f"\n[STEP 5] Tool → Agent (ERROR)",
+                f"         Tool '{fn_name}' not found! Error: {output}",
+            )
 
         # Agent → Gemini API: wrap the tool result and send it back to the model
-        print(f"\n[STEP 6] Agent → Gemini API (Tool Result)")
-        print(f"         Agent is sending the tool result back to Gemini...")
+        trace(
+            f"\n[STEP 6] Agent → Gemini API (Tool Result)",
+            f"         Agent is sending the tool result back to Gemini...",
+        )
 
         result_parts.append(
             types.Part.from_function_response(
@@ -144,42 +185,79 @@ def handle_function_calls(response) -> list[types.Part]:
     return result_parts
 
 
-def chat_turn(chat, user_input: str) -> str:
-    """Send a user message, handle any tool calls, and return the final reply."""
+def send_message(chat, message, on_text: Optional[Callable[[str], None]] = None) -> tuple[str, list[types.Part]]:
+    """Send one message and return the model's text plus the results of any tools it called.
+
+    With on_text, the reply is streamed and each text chunk is passed to on_text
+    as soon as it arrives.
+    """
+    if on_text is None:
+        response = chat.send_message(message)
+        tool_result_parts = handle_function_calls(response)
+        return ("" if tool_result_parts else response.text or ""), tool_result_parts
+
+    text: list[str] = []
+    tool_result_parts: list[types.Part] = []
+    for chunk in chat.send_message_stream(message):
+        if not chunk.candidates or not chunk.candidates[0].content:
+            continue
+        parts = chunk.candidates[0].content.parts or []
+        for part in parts:
+            if part.text:
+                on_text(part.text)
+                text.append(part.text)
+        if any(part.function_call for part in parts):
+            tool_result_parts.extend(handle_function_calls(chunk))
+    return "".join(text), tool_result_parts
+
+
+def chat_turn(chat, user_input: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+    """Send a user message, handle any tool calls, and return the final reply.
+
+    Pass on_text to stream the reply text as it is generated.
+    """
 
     # User → Agent → Gemini API: agent forwards the user message to the model
-    print("\n" + "=" * 50)
-    print("[STEP 1] User → Agent → Gemini API")
-    print(f"         User said: '{user_input}'")
-    print("         Agent is sending this message to Gemini API...")
-    response = chat.send_message(user_input)
+    trace(
+        "\n" + "=" * 50,
+        "[STEP 1] User → Agent → Gemini API",
+        f"         User said: '{user_input}'",
+        "         Agent is sending this message to Gemini API...",
+    )
+    # Agent decides: did Gemini request a tool call in its response?
+    reply, tool_result_parts = send_message(chat, user_input, on_text)
 
     # Agentic loop: keep handling tool calls until the model produces text
     while True:
-        # Agent decides: did Gemini request a tool call in its response?
-        tool_result_parts = handle_function_calls(response)
-
         if not tool_result_parts:  # Agent decides: no tool call → Gemini produced final text
-            print("\n[STEP 2b] Agent decides: No tool call needed.")
-            print("          Gemini produced a direct text response. Done!")
-            print("-" * 50)
+            trace(
+                "\n[STEP 2b] Agent decides: No tool call needed.",
+                "          Gemini produced a direct text response. Done!",
+                "-" * 50,
+            )
             break
 
         # Agent → Gemini API: send tool results back so Gemini can form its final reply
-        print("\n[STEP 7] Agent → Gemini API (Final Request)")
-        print("         Agent is sending the tool result back to Gemini.")
-        print("         Asking Gemini to now form its final answer using the tool result...")
-        response = chat.send_message(tool_result_parts)
+        trace(
+            "\n[STEP 7] Agent → Gemini API (Final Request)",
+            "         Agent is sending the tool result back to Gemini.",
+            "         Asking Gemini to now form its final answer using the tool result...",
+        )
+        reply, tool_result_parts = send_message(chat, tool_result_parts, on_text)
 
-        print("\n[STEP 8] Gemini API → Agent (Final Response)")
-        print("         Gemini has used the tool result to form its final reply.")
-        print("-" * 50)
+        trace(
+            "\n[STEP 8] Gemini API → Agent (Final Response)",
+            "         Gemini has used the tool result to form its final reply.",
+            "-" * 50,
+        )
 
     # Gemini API → Agent → User: return the model's final text response
-    print("\n[STEP 9] Gemini API → Agent → User")
-    print("         Agent is returning Gemini's final answer to the user.")
-    print("=" * 50)
-    return response.text.strip()
+    trace(
+        "\n[STEP 9] Gemini API → Agent → User",
+        "         Agent is returning Gemini's final answer to the user.",
+        "=" * 50,
+    )
+    return reply.strip()
 
 
 # ---------------------------------------------------------------------------
@@ -213,8 +291,13 @@ def main() -> None:
             break
 
         try:
-            reply = chat_turn(chat, user_input)
-            print(f"\nGemini: {reply}\n")
+            if STREAM:
+                print("\nGemini: ", end="", flush=True)
+                chat_turn(chat, user_input, on_text=lambda text: print(text, end="", flush=True))
+                print("\n")
+            else:
+                reply = chat_turn(chat, user_input)
+                print(f"\nGemini: {reply}\n")
         except Exception as exc:
             print(f"\n[error] {exc}\n")
 
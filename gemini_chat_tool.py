@@ -43,6 +43,19 @@ def get_current_datetime() -> str:
     return datetime.now(timezone.utc).isoformat(timespec="seconds")
 
 
+TOOLS = [get_current_datetime]
+
+# Built once and shared by both calls, so every request opens with the same
+# tool declarations and the follow-up only appends turns after them.
+CONFIG = types.GenerateContentConfig(
+    tools=TOOLS,
+    # Disable auto-calling so WE stay in control of all function calls.
+    # Without this, the model's built-in tools (e.g. google_search) can
+    # trigger a KeyError because the SDK can't find them in our function map.
+    automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+)
+
+
 # ── Main chat function ────────────────────────────────────────────────────────
 
 def chat_with_tool(user_prompt: str) -> None:
@@ -77,7 +90,6 @@ def chat_with_tool(user_prompt: str) -> None:
     print("   We define a Python function `get_current_datetime()`")
     print("   and pass it to the SDK. Gemini will receive a description")
     print("   of what this tool does and can choose to call it.")
-    tools = [get_current_datetime]
     print(f"   {OK} Tool registered: get_current_datetime\n")
 
     # ── STEP 3: Send User Prompt to Gemini (1st API Call) ────────────
@@ -91,13 +103,7 @@ def chat_with_tool(user_prompt: str) -> None:
     response = client.models.generate_content(
         model="gemini-3-flash-preview",
         contents=user_prompt,
-        config=types.GenerateContentConfig(
-            tools=tools,
-            # Disable auto-calling so WE stay in control of all function calls.
-            # Without this, the model's built-in tools (e.g. google_search) can
-            # trigger a KeyError because the SDK can't find them in our function map.
-            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
-        ),
+        config=CONFIG,
     )
     print(f"   {OK} Got response from Gemini.\n")
 
@@ -147,10 +153,7 @@ def chat_with_tool(user_prompt: str) -> None:
                     response.candidates[0].content,       # Gemini's tool-call turn
                     types.Content(role="user", parts=[tool_response_part]),
                 ],
-                config=types.GenerateContentConfig(
-                    tools=tools,
-                    automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
-                ),
+                config=CONFIG,
             )
             print(f"   {OK} Got final response from Gemini.\n")
 
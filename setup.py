@@ -0,0 +1,28 @@
+"""Optional mypyc build for the local file-backed chat prototype.
+
+Project metadata, packages and console scripts live in pyproject.toml; this
+file only adds compiled extensions. Set RAG_CHAT_MYPYC=1 when building to
+compile the message/tail hot path (src/core/message_handler.py,
+src/core/chat_io.py) to C extensions with mypyc (needs mypy and a C compiler).
+The compiled modules shadow the .py sources under the same import names;
+without the flag the pure-Python modules are installed unchanged.
+"""
+import os
+
+from setuptools import setup
+
+ext_modules = []
+if os.environ.get("RAG_CHAT_MYPYC") == "1":
+    from mypyc.build import mypycify
+
+    # Resolve module names from src/ (core.message_handler, not src.core...);
+    # optional speedups such as inotify_simple ship without type stubs.
+    os.environ["MYPYPATH"] = "src"
+    ext_modules = mypycify([
+        "--explicit-package-bases",
+        "--ignore-missing-imports",
+        "src/core/message_handler.py",
+        "src/core/chat_io.py",
+    ])
+
+setup(ext_modules=ext_modules)
@@ -1,27 +1,45 @@
 import argparse
+import json
+import signal
 import threading
-import time
-import os
-import sys
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from core.message_handler import parse_message, create_message, dump_message
-
-
-def monitor_history_file(history_file: str, stop_event: threading.Event, on_message_received, poll_interval: float = 0.5):
-    """Monitor history file for new messages and invoke callback for each."""
-    with open(history_file, "r", encoding="utf-8") as f:
-        f.seek(0, os.SEEK_END)
-        while not stop_event.is_set():
-            line = f.readline()
-            if not line:
-                time.sleep(poll_interval)
-                continue
-            try:
-                msg = parse_message(line)
-            except Exception:
-                continue
-            on_message_received(msg)
+from core.chat_io import TAIL_BACKENDS, HistoryTail, QueuedHistoryWriter, make_chat_message_filter
+from core.message_handler import create_message, dump_message, new_message_id, now_iso
+
+# Characters dump_message would escape inside a JSON string
+_JSON_UNSAFE = frozenset(map(chr, range(0x20))) | {'"', "\\"}
+
+
+def make_echo_line_renderer(bot_nick: str):
+    """
+    Return a function that renders an echo reply as a history line.
+
+    Only the text, ts and id of a reply change, so the rest of the JSON is
+    built once. Payloads that would need escaping go through dump_message.
+    """
+    prefix = '{"type":"message","nick":' + json.dumps(bot_nick, ensure_ascii=False) + ',"text":"Echo: '
+
+    def render_echo_line(payload: str) -> bytes:
+        if not _JSON_UNSAFE.isdisjoint(payload):
+            return dump_message(create_message("message", bot_nick, "Echo: " + payload)) + b"\n"
+        return f'{prefix}{payload}","ts":"{now_iso()}","id":"{new_message_id()}","source":"local"}}\n'.encode("utf-8")
+
+    return render_echo_line
+
+
+def make_echo_line_filter(bot_nick: str):
+    """
+    Return a skip_line predicate rejecting raw history lines the echo bot ignores.
+
+    Messages without an !echo command are dropped before JSON parsing, as are
+    the bot's own lines and non-"message" types (see make_chat_message_filter).
+    """
+    skip_non_chat = make_chat_message_filter(bot_nick)
+    command_marker = b"!echo "
+
+    def skip_line(line: bytes) -> bool:
+        return command_marker not in line or skip_non_chat(line)
+
+    return skip_line
 
 
 def main():
@@ -29,12 +47,17 @@ def main():
     parser.add_argument("--nick", default="echo-bot")
     parser.add_argument("--history-file", default="history.jsonl")
     parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--backend", choices=TAIL_BACKENDS, default="auto")
+    parser.add_argument("--segmented", action="store_true", help="Write to hourly history segment files")
     args = parser.parse_args()
 
     bot_nick = args.nick
     history_file = args.history_file
+    # Opened once (created if missing); replies from a burst go out in one writev
+    history = QueuedHistoryWriter(history_file, args.segmented)
 
     stop_event = threading.Event()
+    render_echo_line = make_echo_line_renderer(bot_nick)
 
     def on_message_received(msg):
         """Echo bot: ignore own messages, filter for non-message types, respond to !echo commands."""
@@ -48,23 +71,22 @@ def main():
         message_text = msg.get("text", "")
         if message_text.startswith("!echo "):
             payload = message_text[len("!echo "):]
-            response = create_message("message", bot_nick, "Echo: " + payload)
-            with open(history_file, "a", encoding="utf-8") as f:
-                f.write(dump_message(response) + "\n")
-                f.flush()
+            history.write(render_echo_line(payload))
 
+    history_tail = HistoryTail(history_file, args.poll_interval, args.backend, make_echo_line_filter(bot_nick))
     monitor_thread = threading.Thread(
-        target=monitor_history_file,
-        args=(history_file, stop_event, on_message_received, args.poll_interval),
+        target=history_tail.follow,
+        args=(stop_event, on_message_received),
         daemon=True
     )
     monitor_thread.start()
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        stop_event.set()
+    # Sleep until Ctrl+C; no periodic wakeups while idle
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    stop_event.wait()
+    signal.signal(signal.SIGINT, signal.SIG_DFL)  # a second Ctrl+C quits without waiting for the shutdown
+    monitor_thread.join(timeout=1)
+    history.close()
 
 
 if __name__ == "__main__":
@@ -1,94 +1,212 @@
 import argparse
+import json
+import signal
 import threading
-import time
-import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import sys
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from core.message_handler import parse_message, create_message, dump_message
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("Error: google-generativeai not installed")
-    print("Install with: pip install google-generativeai")
-    sys.exit(1)
-
-
-def monitor_history_file(history_file: str, stop_event: threading.Event, on_message_received, poll_interval: float = 0.5):
-    """Monitor history file for new messages and invoke callback for each."""
-    with open(history_file, "r", encoding="utf-8") as f:
-        f.seek(0, os.SEEK_END)
-        while not stop_event.is_set():
-            line = f.readline()
-            if not line:
-                time.sleep(poll_interval)
-                continue
-            try:
-                msg = parse_message(line)
-            except Exception:
-                continue
-            on_message_received(msg)
+from core.chat_io import TAIL_BACKENDS, HistoryTail, QueuedHistoryWriter, make_chat_message_filter, replay_history
+from core.llm_cache import LLMCache, MemoryLRU, SqliteBackend
+from core.message_handler import create_message
+from core.semantic_cache import SemanticCache
+
+MODEL_NAME = "gemini-3-flash-preview"
+MAX_CONCURRENT_REQUESTS = 8
+REPLAY_BATCH_SIZE = 20  # missed messages answered per request with --replay
+REPLAY_LIMIT = 100  # default cap on messages answered by --replay
+# Sent as the system instruction on every request. Filled in once per run, so
+# each call starts with the same prefix and the API can reuse its cached context.
+PERSONA_TEMPLATE = (
+    "You are {nick}, a friendly participant in a small terminal group chat. "
+    "Reply conversationally in plain text and keep answers short."
+)
+
+
+def build_batch_prompt(turns):
+    """Prompt asking for one reply per (nick, text) turn, returned as a JSON list of strings."""
+    numbered = "\n".join(f"{i}. {nick}: {text}" for i, (nick, text) in enumerate(turns, 1))
+    return (f"Reply to each user turn separately. Return a JSON list of {len(turns)} strings, "
+            f"one reply per turn, in the same order:\n{numbered}")
+
+
+def parse_batch_replies(text, expected):
+    """Return the replies from a batch response, or None if it is not a list of `expected` strings."""
+    try:
+        replies = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(replies, list) or len(replies) != expected or not all(isinstance(r, str) for r in replies):
+        return None
+    return [r.strip() for r in replies]
+
+
+def unanswered_messages(history_file, bot_nick, limit=None, end=None):
+    """
+    Return the messages in history_file (up to byte offset end) posted after the
+    bot's last reply; with limit, only the most recent limit of them.
+    """
+    missed = deque(maxlen=limit)
+    for msg in replay_history(history_file, end=end):
+        if msg.get("nick") == bot_nick:
+            missed.clear()  # everything before this was seen by the bot
+        else:
+            missed.append(msg)
+    return list(missed)
 
 
 def main():
+    try:  # imported here so the helpers above can be used (and tested) without the SDK
+        import google.generativeai as genai
+    except ImportError:
+        print("Error: google-generativeai not installed")
+        print("Install with: pip install google-generativeai")
+        sys.exit(1)
+
     parser = argparse.ArgumentParser(description="Gemini AI bot for local file-backed chat")
     parser.add_argument("--nick", default="gemini-bot")
     parser.add_argument("--history-file", default="history.jsonl")
     parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--backend", choices=TAIL_BACKENDS, default="auto",
+                        help="How to wait for new history lines (auto picks inotify or kqueue when available)")
+    parser.add_argument("--segmented", action="store_true", help="Write to hourly history segment files")
     parser.add_argument("--api-key", required=True, help="Google Gemini API key (get from https://aistudio.google.com/app/apikeys)")
+    parser.add_argument("--temperature", type=float, default=None,
+                        help="Sampling temperature (default: model default); responses are cached only at 0")
+    parser.add_argument("--cache-db", default=None,
+                        help="SQLite file that persists cached responses across runs (default: memory only)")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="Seconds before an on-disk cached response expires (default: never)")
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="Also reuse replies to paraphrased messages via local embeddings; "
+                             "needs --temperature 0, sentence-transformers and hnswlib")
+    parser.add_argument("--replay", nargs="?", type=int, const=REPLAY_LIMIT, default=None, metavar="N",
+                        help="On startup, answer messages posted since the bot's last reply in the history file; "
+                             f"only the latest N of them (default {REPLAY_LIMIT})")
     args = parser.parse_args()
 
     bot_nick = args.nick
     history_file = args.history_file
+    persona = PERSONA_TEMPLATE.format(nick=bot_nick)
 
     # Configure Gemini API
     try:
         genai.configure(api_key=args.api_key)
-        model = genai.GenerativeModel("gemini-3-flash-preview")
+        model = genai.GenerativeModel(MODEL_NAME, system_instruction=persona)
         print(f"[{bot_nick}] Successfully connected to Gemini AI")
     except Exception as e:
         print(f"Error configuring Gemini API: {e}")
         sys.exit(1)
 
+    generation_config = {"temperature": args.temperature} if args.temperature is not None else None
+    backends = [MemoryLRU()]
+    if args.cache_db:
+        backends.append(SqliteBackend(args.cache_db, ttl=args.cache_ttl))
+    response_cache = LLMCache(*backends)
+    semantic_cache = None
+    if args.semantic_cache:
+        if args.temperature != 0:  # like the exact-match cache, never replay sampled replies
+            print("Error: --semantic-cache needs --temperature 0")
+            sys.exit(1)
+        semantic_cache = SemanticCache()
+        try:
+            semantic_cache.load()  # fail fast and pay the model load before the first message
+        except ImportError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    # Opened once (created if missing); worker threads only enqueue their replies
+    history = QueuedHistoryWriter(history_file, args.segmented)
+
     stop_event = threading.Event()
+    # Gemini round-trips take seconds; run them off the monitor thread so a
+    # burst of messages is answered concurrently instead of one after another.
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="gemini")
 
-    def on_message_received(msg):
-        """Gemini bot: respond to all non-command messages with AI-generated responses."""
-        # Don't respond to own messages (prevent infinite loops)
-        if msg.get("nick") == bot_nick:
-            return
-        # Only process chat messages (ignore join/leave)
-        if msg.get("type") != "message":
-            return
-        
-        message_text = msg.get("text", "").strip()
-        if not message_text:
-            return
-        
-        # Skip command messages (starting with !)
-        if message_text.startswith("!"):
-            return
-        
+    def respond(message_text):
         try:
             # Call Gemini API to generate response
-            response = model.generate_content(message_text)
-            ai_response = response.text.strip()
+            def call_api():
+                return model.generate_content(message_text, generation_config=generation_config).text
+
+            def generate():  # on an exact-match miss, try paraphrases before the API
+                if semantic_cache is None:
+                    return call_api()
+                return semantic_cache.get_or_generate(message_text, call_api)
+
+            ai_response = response_cache.get_or_generate(
+                MODEL_NAME, args.temperature, message_text, generate, system=persona).strip()
             
             # Send response back to history
-            resp = create_message("message", bot_nick, ai_response)
-            with open(history_file, "a", encoding="utf-8") as f:
-                f.write(dump_message(resp) + "\n")
-                f.flush()
+            history.write_message(create_message("message", bot_nick, ai_response))
             print(f"[{bot_nick}] Responded to '{message_text[:50]}...'")
         except Exception as e:
             # Log error silently to avoid crashing the bot
             print(f"[{bot_nick}] Error generating response: {e}")
             pass
 
+    batch_config = {**(generation_config or {}), "response_mime_type": "application/json"}
+
+    def respond_batch(turns):
+        """Answer several turns with one request; fall back to one request per turn."""
+        try:
+            prompt = build_batch_prompt(turns)
+            replies = parse_batch_replies(response_cache.get_or_generate(
+                MODEL_NAME, args.temperature, prompt,
+                lambda: model.generate_content(prompt, generation_config=batch_config).text,
+                system=persona,
+            ), len(turns))
+        except Exception as e:
+            print(f"[{bot_nick}] Error generating batch response: {e}")
+            replies = None
+        if replies is None:
+            # Inline, not resubmitted: the pool refuses new work once shutdown starts
+            for _, text in turns:
+                respond(text)
+            return
+        for reply in replies:
+            history.write_message(create_message("message", bot_nick, reply))
+        print(f"[{bot_nick}] Responded to {len(turns)} messages in one request")
+
+    def on_messages_received(msgs):
+        """Gemini bot: respond to all non-command messages with AI-generated responses."""
+        turns = []
+        for msg in msgs:
+            # Don't respond to own messages (prevent infinite loops)
+            if msg.get("nick") == bot_nick:
+                continue
+            # Only process chat messages (ignore join/leave)
+            if msg.get("type") != "message":
+                continue
+
+            message_text = msg.get("text", "").strip()
+            if not message_text:
+                continue
+
+            # Skip command messages (starting with !)
+            if message_text.startswith("!"):
+                continue
+
+            turns.append((msg.get("nick"), message_text))
+
+        # A lone message goes out as-is; only bursts pay for the batch prompt.
+        if len(turns) == 1:
+            executor.submit(respond, turns[0][1])
+        elif turns:
+            executor.submit(respond_batch, turns)
+
+    # Own replies and join/leave lines are dropped before they are parsed
+    history_tail = HistoryTail(history_file, args.poll_interval, args.backend, make_chat_message_filter(bot_nick))
+
+    if args.replay:
+        # Up to where the tail starts: later messages are the tail's, none fall in between
+        missed = unanswered_messages(history_file, bot_nick, args.replay, history_tail.offset)
+        print(f"[{bot_nick}] Replaying {len(missed)} messages since my last reply")
+        for i in range(0, len(missed), REPLAY_BATCH_SIZE):
+            on_messages_received(missed[i:i + REPLAY_BATCH_SIZE])
+
     monitor_thread = threading.Thread(
-        target=monitor_history_file,
-        args=(history_file, stop_event, on_message_received, args.poll_interval),
+        target=history_tail.follow_batches,
+        args=(stop_event, on_messages_received),
         daemon=True
     )
     monitor_thread.start()
@@ -97,12 +215,19 @@ def main():
     print(f"[{bot_nick}] Type messages in chat, and I'll respond with AI!")
     print(f"[{bot_nick}] Press Ctrl+C to stop")
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print(f"\n[{bot_nick}] Shutting down...")
-        stop_event.set()
+    # Sleep until Ctrl+C; no periodic wakeups while idle
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    stop_event.wait()
+    signal.signal(signal.SIGINT, signal.SIG_DFL)  # a second Ctrl+C quits without waiting for the shutdown
+    print(f"\n[{bot_nick}] Shutting down (Ctrl+C again to quit now)...")
+    monitor_thread.join(timeout=1)
+    executor.shutdown(wait=True, cancel_futures=True)  # in-flight replies still reach the writer
+    history.close()
+    stats = response_cache.stats
+    print(f"[{bot_nick}] Response cache: {stats['hits']} hits, {stats['misses']} misses")
+    if semantic_cache is not None:
+        stats = semantic_cache.stats
+        print(f"[{bot_nick}] Semantic cache: {stats['hits']} hits, {stats['misses']} misses")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,501 @@
+"""File transport for the chat: tail new messages from, and append them to, the history file."""
+import atexit
+import json
+import os
+import queue
+import select
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .message_handler import dump_message, parse_message
+
+_ON_LINUX = sys.platform.startswith("linux")  # a variable, so type checkers keep the import on every platform
+try:
+    if not _ON_LINUX:  # inotify_simple imports on macOS too, but cannot create a watch there
+        raise ImportError("inotify is Linux only")
+    from inotify_simple import INotify, flags
+except ImportError:  # non-Linux or inotify_simple not installed: fall back to kqueue or polling
+    INotify = None  # type: ignore[assignment,misc]
+
+_select: Any = select  # kqueue names only exist on macOS/BSD, so look them up dynamically
+HAVE_KQUEUE = hasattr(_select, "kqueue")
+
+TAIL_BACKENDS = ("auto", "inotify", "kqueue", "poll")
+READ_CHUNK_SIZE = 1 << 16  # bytes pulled from the history file per read
+WRITE_BATCH_LIMIT = 512  # most lines QueuedHistoryWriter commits per writev (stays under IOV_MAX)
+
+_STOP_WRITER = object()  # queued by QueuedHistoryWriter.close() to end the writer thread
+
+_segment_cache: Dict[str, Tuple[int, str]] = {}  # history_file -> (UTC hour, current segment path)
+
+
+def segment_path(history_dir: str, ts: Optional[float] = None) -> str:
+    """Return the hourly segment file in history_dir for messages written at ts (default: now)."""
+    if ts is None:
+        ts = time.time()
+    return os.path.join(history_dir, time.strftime("%Y-%m-%dT%H", time.gmtime(ts)) + ".jsonl")
+
+
+def current_history_segment(history_file: str) -> str:
+    """
+    Return the segment that new messages for a segmented history_file go to.
+
+    Segments live in a directory named after history_file without its
+    extension (history.jsonl -> history/2025-01-15T14.jsonl), one per UTC hour.
+    history_file itself is kept as a symlink to the current segment, so readers
+    keep tailing a single path and follow it to the next segment as a rotation.
+    """
+    t = time.time()
+    hour = int(t) // 3600
+    cached = _segment_cache.get(history_file)
+    if cached is not None and cached[0] == hour:
+        return cached[1]
+    segment = segment_path(os.path.splitext(history_file)[0], t)
+    os.makedirs(os.path.dirname(segment), exist_ok=True)
+    open(segment, "a", encoding="utf-8").close()
+    _point_history_link(history_file, segment)
+    _segment_cache[history_file] = (hour, segment)
+    return segment
+
+
+def _point_history_link(history_file: str, segment: str) -> None:
+    """Atomically repoint the history_file symlink at segment."""
+    if os.path.lexists(history_file) and not os.path.islink(history_file):
+        raise ValueError(f"{history_file} is a regular file; move it aside to use segmented history")
+    target = os.path.relpath(segment, os.path.dirname(os.path.abspath(history_file)))
+    if os.path.islink(history_file) and os.readlink(history_file) == target:
+        return
+    tmp_link = f"{history_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, history_file)  # readers see a rename onto history_file
+
+
+class HistoryWriter:
+    """
+    Append to the history file through one fd kept open for the process lifetime.
+
+    Each write() is a single os.write() on an O_APPEND fd, so a batch of lines
+    lands in one syscall and lines from other processes (bots, clients) are
+    never interleaved mid-line. With segmented=True the fd follows
+    current_history_segment() from hour to hour.
+    """
+
+    def __init__(self, history_file: str, segmented: bool = False) -> None:
+        self._history_file = history_file
+        self._segmented = segmented
+        if not segmented and os.path.islink(history_file):
+            # the link's target stops being the current segment when the hour rolls
+            raise ValueError(f"{history_file} is a segmented history link; write to it with segmented=True")
+        self._path = current_history_segment(history_file) if segmented else history_file
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        self._lock = threading.Lock()  # guards the fd against a concurrent segment switch/close
+        atexit.register(self.close)
+
+    def write(self, data: bytes) -> None:
+        """Append already-serialized, newline-terminated history lines."""
+        with self._lock:
+            if self._segmented:
+                self._follow_segment()
+            self._write_all(data)
+
+    def write_lines(self, lines: List[bytes]) -> None:
+        """Append several serialized lines with one scatter-gather os.writev() (no join copy)."""
+        if not hasattr(os, "writev"):  # Windows
+            self.write(b"".join(lines))
+            return
+        with self._lock:
+            if self._segmented:
+                self._follow_segment()
+            written = os.writev(self._fd, lines)
+            if written < sum(len(line) for line in lines):  # short write: finish the rest
+                self._write_all(memoryview(b"".join(lines))[written:])
+
+    def write_message(self, message: dict) -> None:
+        self.write(dump_message(message) + b"\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+        atexit.unregister(self.close)
+
+    def _write_all(self, data: Union[bytes, memoryview]) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)  # not inline in the slice: mypyc evaluates it twice there
+            view = view[written:]
+
+    def _follow_segment(self) -> None:
+        path = current_history_segment(self._history_file)
+        if path != self._path:  # a new hour started: move on to its segment
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+            os.close(self._fd)
+            self._fd, self._path = fd, path
+
+
+class QueuedHistoryWriter:
+    """
+    Append to the history file from a dedicated writer thread.
+
+    write()/write_message() only enqueue, so callers (input loops, bot
+    callbacks) never wait on file I/O. The writer thread drains everything
+    queued since its last pass and commits the burst with a single
+    HistoryWriter.write_lines(). Messages are serialized on the writer thread.
+    """
+
+    def __init__(self, history_file: str, segmented: bool = False) -> None:
+        self._writer = HistoryWriter(history_file, segmented)
+        self._queue: "queue.SimpleQueue[object]" = queue.SimpleQueue()
+        self._closed = False
+        self._closed_lock = threading.Lock()  # nothing may be queued behind the stop marker
+        self._writer_thread = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)  # runs before the HistoryWriter's own hook
+
+    def write(self, line: bytes) -> None:
+        """Queue one serialized, newline-terminated history line."""
+        self._put(line)
+
+    def write_message(self, message: dict) -> None:
+        """Queue a message to be written to the history file."""
+        self._put(message)
+
+    def close(self) -> None:
+        """Write everything queued so far, then stop the writer and close the file."""
+        with self._closed_lock:
+            stop = not self._closed
+            self._closed = True
+            if stop:
+                self._queue.put(_STOP_WRITER)
+        if self._writer_thread.is_alive():
+            self._writer_thread.join()
+        self._writer.close()
+        atexit.unregister(self.close)
+
+    def _put(self, item: object) -> None:
+        with self._closed_lock:
+            if self._closed:
+                raise ValueError("write to closed QueuedHistoryWriter")
+            self._queue.put(item)
+
+    def _run_writer(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]  # block until there is something to write
+            while len(batch) < WRITE_BATCH_LIMIT:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for item in batch:
+                if item is _STOP_WRITER:
+                    stopping = True
+                elif isinstance(item, bytes):
+                    lines.append(item)
+                else:
+                    lines.append(dump_message(item) + b"\n")  # type: ignore[arg-type]
+            if lines:
+                self._writer.write_lines(lines)
+
+
+class _InotifyWatcher:
+    """
+    inotify watch on the history file's directory, for Linux.
+
+    Names in the directory announce a new file at the path (rotation). With
+    segmented history the path is a symlink and the appends land in the segment
+    directory, so that directory is watched too and the watch is moved if a
+    rotation points the link somewhere else.
+    """
+
+    def __init__(self, history_file: str) -> None:
+        self._history_file = history_file
+        self._filename = os.path.basename(history_file)
+        self._dir = os.path.realpath(os.path.dirname(os.path.abspath(history_file)))
+        self._inotify = INotify()
+        self._segment_dir = self._dir
+        self._segment_wd = -1
+        try:
+            self._dir_wd = self._inotify.add_watch(
+                self._dir, flags.MODIFY | flags.CREATE | flags.MOVED_TO | flags.MOVE_SELF)
+            self._watch_segment_dir()
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_segment_dir(self) -> None:
+        segment_dir = os.path.dirname(os.path.realpath(self._history_file))
+        if segment_dir == self._segment_dir:
+            return
+        if self._segment_wd >= 0:
+            try:
+                self._inotify.rm_watch(self._segment_wd)
+            except OSError:
+                pass  # directory already gone
+            self._segment_wd = -1
+        self._segment_dir = segment_dir
+        if segment_dir != self._dir:  # re-adding the same directory would replace its mask
+            self._segment_wd = self._inotify.add_watch(segment_dir, flags.MODIFY)
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to timeout seconds; return True if a new file appeared at the path."""
+        replaced = False
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            if (event.wd == self._dir_wd and event.name == self._filename
+                    and event.mask & (flags.CREATE | flags.MOVED_TO)):
+                replaced = True
+        if replaced:
+            try:
+                self._watch_segment_dir()
+            except OSError:
+                pass  # segment directory not there yet; the next rotation retries
+        return replaced
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+class _KqueueWatcher:
+    """
+    kqueue counterpart of _InotifyWatcher, for macOS/BSD.
+
+    kqueue watches open files rather than names, so it listens for writes on
+    the history file and for entry changes in its directory. The directory
+    event is what announces a new file at the path (rotation); the file watch is
+    then moved to whatever the path names now.
+    """
+
+    def __init__(self, history_file: str) -> None:
+        self._history_file = history_file
+        self._kq = _select.kqueue()
+        self._file_fd = -1
+        self._dir_fd = os.open(os.path.dirname(os.path.abspath(history_file)), os.O_RDONLY)
+        try:
+            self._watch(self._dir_fd, _select.KQ_NOTE_WRITE)
+            self._watch_file()
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, fd: int, fflags: int) -> None:
+        self._kq.control([_select.kevent(fd, filter=_select.KQ_FILTER_VNODE,
+                                         flags=_select.KQ_EV_ADD | _select.KQ_EV_CLEAR, fflags=fflags)], 0)
+
+    def _watch_file(self) -> None:
+        fd = os.open(self._history_file, os.O_RDONLY)
+        if self._file_fd >= 0:
+            os.close(self._file_fd)  # closing the fd also drops its kevent
+        self._file_fd = fd
+        self._watch(fd, _select.KQ_NOTE_WRITE | _select.KQ_NOTE_EXTEND
+                    | _select.KQ_NOTE_DELETE | _select.KQ_NOTE_RENAME)
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to timeout seconds; return True if the directory's entries changed."""
+        events = self._kq.control(None, 8, timeout)
+        if not any(event.ident == self._dir_fd for event in events):
+            return False
+        try:
+            self._watch_file()
+        except OSError:
+            pass  # new file not there yet; the next directory event retries
+        return True
+
+    def close(self) -> None:
+        for fd in (self._file_fd, self._dir_fd):
+            if fd >= 0:
+                os.close(fd)
+        self._file_fd = self._dir_fd = -1
+        self._kq.close()
+
+
+def _open_watcher(history_file: str, backend: str = "auto"):
+    """Return an inotify or kqueue watcher for the history file, or None to poll."""
+    if backend not in TAIL_BACKENDS:
+        raise ValueError(f"Unknown tail backend: {backend}")
+    if backend == "poll":
+        return None
+    if backend == "kqueue" or (backend == "auto" and INotify is None and HAVE_KQUEUE):
+        if not HAVE_KQUEUE:
+            raise RuntimeError("kqueue backend requires macOS or BSD")
+        try:
+            return _KqueueWatcher(history_file)
+        except OSError:
+            if backend == "kqueue":
+                raise
+            return None
+    if INotify is None:
+        if backend == "inotify":
+            raise RuntimeError("inotify backend requires inotify_simple (Linux only)")
+        return None
+    try:
+        return _InotifyWatcher(history_file)
+    except (OSError, AttributeError):  # AttributeError: no inotify_init1 in this libc
+        if backend == "inotify":
+            raise
+        return None
+
+
+def _wait_for_change(watcher, timeout: float, stop_event: threading.Event) -> bool:
+    """
+    Block until the history file may have new data or timeout seconds pass.
+
+    Returns True when the file was replaced (log rotation) and must be reopened.
+    When polling, setting stop_event ends the wait early.
+    """
+    if watcher is None:
+        stop_event.wait(timeout)
+        return False
+    return watcher.wait(timeout)
+
+
+def replay_history(history_file: str, skip_line: Optional[Callable[[bytes], bool]] = None,
+                   end: Optional[int] = None) -> Iterator[dict]:
+    """
+    Yield the messages already in history_file, oldest first.
+
+    Same line rules as HistoryTail: malformed lines are skipped, a trailing line
+    without its newline is still being written and is left out, and skip_line
+    can reject raw lines before they are parsed. end, if given, stops at that
+    byte offset, e.g. HistoryTail.offset so replay and tail do not overlap.
+    """
+    position = 0
+    with open(history_file, "rb") as f:  # buffered line iteration beats mmap + find here; parsing dominates
+        for line in f:
+            position += len(line)
+            if not line.endswith(b"\n") or (end is not None and position > end):
+                break
+            if skip_line is not None and skip_line(line):
+                continue
+            try:
+                yield parse_message(line)
+            except Exception:
+                continue
+
+
+def make_chat_message_filter(own_nick: str) -> Callable[[bytes], bool]:
+    """
+    Return a skip_line predicate keeping only "message" lines not sent by own_nick.
+
+    Bots use it to drop their own replies and join/leave notices before JSON
+    parsing. Quotes inside JSON strings are escaped, so the markers only match
+    real keys. Both json.dumps and compact (no-space) layouts are recognised.
+    """
+    nick_json = json.dumps(own_nick, ensure_ascii=False)
+    own_markers = tuple(f'"nick":{sep}{nick_json}'.encode("utf-8") for sep in (" ", ""))
+    message_markers = (b'"type": "message"', b'"type":"message"')
+
+    def skip_line(line: bytes) -> bool:
+        if any(marker in line for marker in own_markers):
+            return True
+        return not any(marker in line for marker in message_markers)
+
+    return skip_line
+
+
+class HistoryTail:
+    """
+    Follow the history file from its current end and hand new messages to a callback.
+
+    Pattern: Remember the end of the file at construction, block on inotify or
+    kqueue (or poll every poll_interval seconds when neither is available) until the file grows,
+    pread the new bytes in bulk and split them into lines, parse JSON, skip
+    malformed lines silently, invoke the callback for each valid message. A line
+    is only parsed once its newline has been written. Rotation (a new file at
+    the same path) and truncation are followed from the start of the new content.
+
+    backend is one of TAIL_BACKENDS; "auto" uses inotify, then kqueue, when available.
+    skip_line, if given, is called with each raw line (bytes) and returning True
+    drops it without parsing, so callers can cheaply reject lines they ignore.
+    """
+
+    def __init__(self, history_file: str, poll_interval: float = 0.5, backend: str = "auto",
+                 skip_line: Optional[Callable[[bytes], bool]] = None) -> None:
+        self._history_file = history_file
+        self._poll_interval = poll_interval
+        self._skip_line = skip_line
+        self._watcher = _open_watcher(history_file, backend)
+        self._fd = os.open(history_file, os.O_RDONLY)  # raw fd: positioned reads, no str decode before JSON
+        st = os.fstat(self._fd)
+        self._offset, self._inode = st.st_size, st.st_ino  # start at the end to only see new lines
+
+    @property
+    def offset(self) -> int:
+        """Byte offset in the history file read up to so far (its end, until following starts)."""
+        return self._offset
+
+    def follow(self, stop_event: threading.Event, on_message_received: Callable[[dict], None]) -> None:
+        """Deliver new messages one at a time until stop_event is set, then close the tail."""
+        def deliver(messages: List[dict]) -> None:
+            for msg in messages:
+                on_message_received(msg)  # invoke handler with parsed message
+
+        self.follow_batches(stop_event, deliver)
+
+    def follow_batches(self, stop_event: threading.Event,
+                       on_messages_received: Callable[[List[dict]], None]) -> None:
+        """Like follow(), but deliver each read's messages together as one non-empty list."""
+        skip_line = self._skip_line
+        pending = b""  # trailing partial line from the previous read
+        replaced = False
+        try:
+            while not stop_event.is_set():
+                size = os.fstat(self._fd).st_size
+                if size > self._offset:
+                    chunk = os.pread(self._fd, min(size - self._offset, READ_CHUNK_SIZE), self._offset)
+                    self._offset += len(chunk)
+                    # One split over the whole chunk; the last piece is an unfinished line
+                    *lines, pending = (pending + chunk).split(b"\n")
+                    messages = []
+                    for line in lines:
+                        if skip_line is not None and skip_line(line):
+                            continue  # caller doesn't want it; don't pay for parsing
+                        try:
+                            messages.append(parse_message(line))  # convert JSON line into dict
+                        except Exception:
+                            continue  # skip malformed lines silently
+                    if messages:
+                        on_messages_received(messages)
+                    continue
+                if size < self._offset:  # truncated in place: start over from the top
+                    self._offset, pending = 0, b""
+                    continue
+                # Caught up with this file. If the path now names a different file
+                # (log rotation), switch to it and read it from the start.
+                if (replaced or self._watcher is None) and self._reopen_if_rotated():
+                    pending = b""
+                    continue
+                replaced = _wait_for_change(self._watcher, self._poll_interval, stop_event)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def _reopen_if_rotated(self) -> bool:
+        try:
+            if os.stat(self._history_file).st_ino == self._inode:
+                return False
+            rotated = os.open(self._history_file, os.O_RDONLY)
+        except OSError:
+            return False  # new file not there yet; keep the old one
+        os.close(self._fd)
+        self._fd = rotated
+        self._inode = os.fstat(rotated).st_ino
+        self._offset = 0
+        return True
+
+
+def monitor_history_file(history_file: str, stop_event: threading.Event,
+                         on_message_received: Callable[[dict], None], poll_interval: float = 0.5,
+                         backend: str = "auto", skip_line: Optional[Callable[[bytes], bool]] = None) -> None:
+    """Tail history_file from its current end until stop_event is set (see HistoryTail)."""
+    HistoryTail(history_file, poll_interval, backend, skip_line).follow(stop_event, on_message_received)
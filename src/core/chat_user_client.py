@@ -1,45 +1,50 @@
 import argparse  # parse command-line arguments
-import json  # read/write JSON strings
 import threading  # run background tail thread
-import time  # sleep for polling
-import uuid  # generate unique IDs for messages
-import datetime  # get timestamps
-import os  # filesystem helpers
-import sys  # system utilities (unused but common)
-from .message_handler import create_message, dump_message, parse_message  # helper functions for messages
+import sys  # read piped stdin directly
+from .chat_io import TAIL_BACKENDS, HistoryTail, QueuedHistoryWriter  # history file transport
+from .message_handler import create_message, now_iso  # helper functions for messages
 
 
 def get_current_utc_timestamp():
     """Return current UTC timestamp in ISO8601 format with trailing Z."""
-    return datetime.datetime.utcnow().isoformat() + "Z"
+    return now_iso()
 
 
-def append_message_to_history(history_file: str, message: dict):
-    """Append a serialized JSON message to the history file atomically (newline-delimited)."""
-    with open(history_file, "a", encoding="utf-8") as f:
-        f.write(dump_message(message) + "\n")
-        f.flush()  # ensure it's written to disk immediately
+READLINE_HISTORY_LENGTH = 100  # lines of input kept for up-arrow recall on a terminal
 
 
-def monitor_history_file(history_file: str, stop_event: threading.Event, on_message_received, poll_interval: float = 0.5):
+def make_user_input_reader(nick: str):
     """
-    Continuously monitor history_file for new lines and invoke on_message_received callback.
-    
-    Pattern: Seek to end on startup, poll periodically for new lines, parse JSON,
-    skip malformed lines silently, invoke callback for each valid message.
+    Return a function that reads one line of user input ("" at EOF).
+
+    Piped input is read straight from sys.stdin with no prompt. On a terminal,
+    input() keeps line editing, but readline history is capped at
+    READLINE_HISTORY_LENGTH entries instead of growing for the whole session.
     """
-    with open(history_file, "r", encoding="utf-8") as f:
-        f.seek(0, os.SEEK_END)  # move to end to only see new lines
-        while not stop_event.is_set():
-            line = f.readline()
-            if not line:  # no new line yet
-                time.sleep(poll_interval)
-                continue
-            try:
-                msg = parse_message(line)  # convert JSON line into dict
-            except Exception:
-                continue  # skip malformed lines silently
-            on_message_received(msg)  # invoke handler with parsed message
+    if not sys.stdin.isatty():
+        return sys.stdin.readline
+
+    try:
+        import readline  # line editing; unavailable on some platforms (e.g. Windows)
+    except ImportError:
+        readline = None  # type: ignore[assignment]
+    else:
+        readline.set_auto_history(False)  # we add (and trim) entries ourselves
+
+    prompt = f"{nick}> "
+
+    def read_user_input() -> str:
+        try:
+            line = input(prompt)
+        except EOFError:
+            return ""
+        if readline is not None and line.strip():
+            readline.add_history(line)
+            if readline.get_current_history_length() > READLINE_HISTORY_LENGTH:
+                readline.remove_history_item(0)
+        return line + "\n"
+
+    return read_user_input
 
 
 def display_message_to_console(current_user_nick: str, message: dict):
@@ -57,20 +62,21 @@ def display_message_to_console(current_user_nick: str, message: dict):
         print(f"[{timestamp}] {sender_nick}: {message_text}")
 
 
-def run_interactive_chat_client(nick: str, history_file: str, poll_interval: float = 0.5):
+def run_interactive_chat_client(nick: str, history_file: str, poll_interval: float = 0.5, backend: str = "auto",
+                                segmented: bool = False):
     """
     Main entry point for interactive chat client.
     
     Responsibilities:
-    - Ensure history file exists
+    - Open the history file for appending (creating it if missing)
     - Start background thread to monitor incoming messages
     - Send join announcement
     - Run interactive input loop to capture user messages
     - Handle quit commands and Ctrl+C gracefully
     - Send leave announcement on exit
     """
-    # Ensure history file exists
-    open(history_file, "a", encoding="utf-8").close()
+    # Open (and create if missing) the history file once; writes happen on a writer thread
+    history = QueuedHistoryWriter(history_file, segmented)
 
     stop_event = threading.Event()
 
@@ -81,24 +87,26 @@ def run_interactive_chat_client(nick: str, history_file: str, poll_interval: flo
         except Exception:
             pass  # ignore errors in displaying
 
-    # Start background thread to monitor history file
+    # Start background thread to monitor history file (positioned at its end before we write)
+    history_tail = HistoryTail(history_file, poll_interval, backend)
     monitor_thread = threading.Thread(
-        target=monitor_history_file,
-        args=(history_file, stop_event, on_message_received, poll_interval),
+        target=history_tail.follow,
+        args=(stop_event, on_message_received),
         daemon=True
     )
     monitor_thread.start()
 
     # Announce join
     join_message = create_message("join", nick, "")
-    append_message_to_history(history_file, join_message)
+    history.write_message(join_message)
+
+    read_user_input = make_user_input_reader(nick)
 
     try:
         while True:
-            try:
-                user_input = input(f"{nick}> ")
-            except EOFError:
-                break
+            user_input = read_user_input()
+            if not user_input:
+                break  # EOF
 
             message_text = user_input.strip()
             if not message_text:
@@ -107,21 +115,22 @@ def run_interactive_chat_client(nick: str, history_file: str, poll_interval: flo
             # Handle quit commands
             if message_text.lower() in ("/quit", "/exit"):
                 leave_message = create_message("leave", nick, "")
-                append_message_to_history(history_file, leave_message)
+                history.write_message(leave_message)
                 break
 
             # Send regular chat message
             chat_message = create_message("message", nick, message_text)
-            append_message_to_history(history_file, chat_message)
+            history.write_message(chat_message)
 
     except KeyboardInterrupt:
         # On Ctrl+C, send leave message
         leave_message = create_message("leave", nick, "")
-        append_message_to_history(history_file, leave_message)
+        history.write_message(leave_message)
 
     finally:
         stop_event.set()  # signal monitor thread to stop
         monitor_thread.join(timeout=1)  # wait briefly for thread to exit
+        history.close()  # flush any buffered messages
 
 
 def main():
@@ -132,12 +141,18 @@ def main():
     parser.add_argument("--nick", required=True, help="Your nickname")
     parser.add_argument("--history-file", default="history.jsonl", help="Path to history file")
     parser.add_argument("--poll-interval", type=float, default=0.5, help="History poll interval (seconds)")
+    parser.add_argument("--backend", choices=TAIL_BACKENDS, default="auto",
+                        help="How to wait for new history lines (auto picks inotify or kqueue when available)")
+    parser.add_argument("--segmented", action="store_true",
+                        help="Write hourly segment files; history file becomes a symlink to the current one")
     args = parser.parse_args()
 
     run_interactive_chat_client(
         nick=args.nick,
         history_file=args.history_file,
-        poll_interval=args.poll_interval
+        poll_interval=args.poll_interval,
+        backend=args.backend,
+        segmented=args.segmented
     )
 
 
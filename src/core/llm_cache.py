@@ -0,0 +1,130 @@
+"""Response cache for LLM calls, keyed on (model, temperature, prompt)."""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Protocol
+
+try:
+    import xxhash
+except ImportError:  # xxhash not installed: key with hashlib's sha256
+    xxhash = None  # type: ignore[assignment]
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, response: str) -> None: ...
+
+
+class MemoryLRU:
+    """In-process cache holding the maxsize most recently used responses."""
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+class SqliteBackend:
+    """On-disk cache in a single SQLite table; entries older than ttl seconds are ignored."""
+
+    def __init__(self, path: str, ttl: Optional[float] = None) -> None:
+        self._ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()  # one connection shared by the bot's threads
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response, ts FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, ts = row
+        if self._ttl is not None and time.time() - ts > self._ttl:
+            return None  # expired; the next set() overwrites it
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, ts) VALUES (?, ?, ?)",
+                (key, response, int(time.time())),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def cache_key(model: str, temperature: Optional[float], prompt: str, system: Optional[str] = None) -> str:
+    """
+    Hash a call's inputs into a cache key (NUL cannot occur in the model name or system instruction).
+
+    The key only has to be collision-free, not cryptographic, so the faster
+    xxh3-128 is used when xxhash is installed. Keys differ between the two
+    hashes, so an on-disk cache is only reused by installs that hash alike.
+    """
+    data = f"{model}\x00{temperature}\x00{system}\x00{prompt}".encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache deterministic LLM responses in front of one or more backends.
+
+    Only temperature-0 calls are cached: sampled responses are meant to vary,
+    so replaying one would change behaviour. Backends are checked in order and
+    a hit in a later (slower) one is copied into the earlier ones.
+    """
+
+    def __init__(self, *backends: CacheBackend) -> None:
+        self._backends = backends
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()  # callers may run on a thread pool
+
+    def get_or_generate(self, model: str, temperature: Optional[float], prompt: str,
+                        generate: Callable[[], str], system: Optional[str] = None) -> str:
+        """
+        Return the cached response for this call, or call generate() and cache its result.
+
+        system is the call's system instruction, if any; responses are only
+        shared between calls made with the same one.
+        """
+        if temperature != 0:
+            return generate()
+        key = cache_key(model, temperature, prompt, system)
+        for i, backend in enumerate(self._backends):
+            response = backend.get(key)
+            if response is not None:
+                with self._stats_lock:
+                    self.stats["hits"] += 1
+                for faster in self._backends[:i]:
+                    faster.set(key, response)
+                return response
+        with self._stats_lock:
+            self.stats["misses"] += 1
+        response = generate()
+        for backend in self._backends:
+            backend.set(key, response)
+        return response
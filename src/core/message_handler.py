@@ -1,10 +1,64 @@
-import json
-import uuid
-import datetime
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple, Union
 
+try:
+    import orjson
+except ImportError:  # orjson not installed: use the stdlib json module
+    orjson = None  # type: ignore[assignment]
+    import json
 
-def now_iso():
-    return datetime.datetime.utcnow().isoformat() + "Z"
+try:
+    import msgspec
+except ImportError:  # msgspec not installed: parse with orjson or json
+    msgspec = None  # type: ignore[assignment]
+
+
+# Decodes straight into a dict. Same checks as the json path below, so which
+# lines are accepted does not depend on msgspec being installed.
+_message_decoder = msgspec.json.Decoder(Dict[str, Any]) if msgspec is not None else None
+
+_ts_cache: Tuple[int, str] = (-1, "")  # (UTC second, "YYYY-MM-DDTHH:MM:SS." prefix for that second)
+
+_ID_BATCH = 256  # message ids minted per os.urandom read (one 4 KiB read)
+_id_pool: Deque[str] = deque()
+_id_refill_lock = threading.Lock()
+_UUID_VARIANT = {c: "89ab"[int(c, 16) & 3] for c in "0123456789abcdef"}  # RFC 4122 variant nibble
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_id_pool.clear)  # a forked child must not reuse its parent's ids
+
+
+def now_iso() -> str:
+    """Return the current UTC time as ISO8601 with microseconds and a trailing Z."""
+    global _ts_cache
+    t = time.time()
+    sec = int(t)
+    cached_sec, prefix = _ts_cache
+    if sec != cached_sec:  # only the sub-second part changes within a second
+        st = time.gmtime(sec)
+        prefix = (f"{st.tm_year:04d}-{st.tm_mon:02d}-{st.tm_mday:02d}"
+                  f"T{st.tm_hour:02d}:{st.tm_min:02d}:{st.tm_sec:02d}.")
+        _ts_cache = (sec, prefix)  # single rebind, so readers never see a torn pair
+    return f"{prefix}{int((t - sec) * 1_000_000):06d}Z"
+
+
+def new_message_id() -> str:
+    """Return a random UUID4 string, e.g. "2c5ea4c0-4067-4b3b-9c5b-2f1a8e6d3f9a"."""
+    while True:
+        try:
+            return _id_pool.popleft()
+        except IndexError:
+            pass
+        with _id_refill_lock:
+            if not _id_pool:  # another thread may have refilled it while we waited
+                h = os.urandom(16 * _ID_BATCH).hex()
+                _id_pool.extend(
+                    f"{h[i:i + 8]}-{h[i + 8:i + 12]}-4{h[i + 13:i + 16]}-"
+                    f"{_UUID_VARIANT[h[i + 16]]}{h[i + 17:i + 20]}-{h[i + 20:i + 32]}"
+                    for i in range(0, len(h), 32)
+                )
 
 
 def create_message(mtype: str, nick: str, text: str, source: str = "local") -> dict:
@@ -13,20 +67,32 @@ def create_message(mtype: str, nick: str, text: str, source: str = "local") -> d
         "nick": nick,
         "text": text,
         "ts": now_iso(),
-        "id": str(uuid.uuid4()),
+        "id": new_message_id(),
         "source": source,
     }
 
 
-def dump_message(message: dict) -> str:
-    return json.dumps(message, ensure_ascii=False)
+def dump_message(message: dict) -> bytes:
+    """Serialize a message to compact UTF-8 JSON (same layout with or without orjson)."""
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
+def parse_message(line: Union[str, bytes]) -> dict:
+    """
+    Parse one history line (str or UTF-8 bytes) into a message dict.
 
-def parse_message(line: str) -> dict:
-    obj = json.loads(line)
-    # Basic validation
-    if not isinstance(obj, dict):
-        raise ValueError("Invalid message")
+    Raises ValueError for malformed JSON or a line that is not a message.
+    """
+    obj: Any  # not dict: mypyc would raise TypeError on a non-object before the check below
+    if _message_decoder is not None:
+        obj = _message_decoder.decode(line)  # rejects non-objects itself
+    else:
+        obj = orjson.loads(line) if orjson is not None else json.loads(line)
+        # Basic validation
+        if not isinstance(obj, dict):
+            raise ValueError("Invalid message")
     if "type" not in obj or "nick" not in obj:
         raise ValueError("Missing required fields")
     return obj
@@ -0,0 +1,85 @@
+"""Embedding-based response cache that also answers paraphrases of earlier prompts."""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.15  # cosine distance; lower only matches closer paraphrases
+
+
+class SemanticCache:
+    """
+    Cache responses by prompt meaning rather than exact text.
+
+    Prompts are embedded with a small local sentence-transformers model and
+    kept in an hnswlib cosine index. A prompt within threshold cosine distance
+    of a cached one gets that prompt's response. Beyond max_entries the least
+    recently used entry is dropped and its index slot reused.
+
+    sentence-transformers and hnswlib are optional dependencies, imported on
+    load() (or the first lookup) so the module costs nothing when unused.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_entries: int = 10_000,
+                 model_name: str = DEFAULT_EMBEDDING_MODEL) -> None:
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._model_name = model_name
+        self._encoder: Any = None
+        self._index: Any = None
+        self._responses: "OrderedDict[int, str]" = OrderedDict()  # index label -> response, oldest first
+        self._next_label = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def load(self) -> None:
+        """Load the embedding model and create the index (done once; ~80 MB download on first run)."""
+        with self._lock:
+            if self._encoder is not None:
+                return
+            try:
+                import hnswlib
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "The semantic cache needs sentence-transformers and hnswlib: "
+                    "pip install sentence-transformers hnswlib"
+                ) from e
+            encoder = SentenceTransformer(self._model_name)
+            index = hnswlib.Index(space="cosine", dim=encoder.get_sentence_embedding_dimension())
+            index.init_index(max_elements=self._max_entries, allow_replace_deleted=True)
+            self._index, self._encoder = index, encoder
+
+    def get_or_generate(self, prompt: str, generate: Callable[[], str]) -> str:
+        """Return the response cached for a similar prompt, or call generate() and cache its result."""
+        if self._encoder is None:
+            self.load()
+        embedding = self._encoder.encode(prompt, normalize_embeddings=True)
+        with self._lock:
+            response = self._nearest(embedding)
+            self.stats["hits" if response is not None else "misses"] += 1
+        if response is not None:
+            return response
+        response = generate()
+        with self._lock:
+            self._add(embedding, response)
+        return response
+
+    def _nearest(self, embedding: Any) -> Optional[str]:
+        if not self._responses:
+            return None
+        labels, distances = self._index.knn_query(embedding, k=1)
+        label = int(labels[0][0])
+        if distances[0][0] > self._threshold or label not in self._responses:
+            return None
+        self._responses.move_to_end(label)
+        return self._responses[label]
+
+    def _add(self, embedding: Any, response: str) -> None:
+        if len(self._responses) >= self._max_entries:
+            evicted, _ = self._responses.popitem(last=False)
+            self._index.mark_deleted(evicted)
+        label = self._next_label
+        self._next_label += 1
+        self._index.add_items([embedding], [label], replace_deleted=True)
+        self._responses[label] = response
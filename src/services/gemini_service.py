@@ -24,6 +24,11 @@ class GeminiService:
         self.client = genai.Client(api_key=self.api_key)
         self.model_id = "gemini-3-flash-preview"
         self.tools = [self.get_current_datetime]
+        # Same config for the first call and the tool follow-up; built once, not per request
+        self.config = types.GenerateContentConfig(
+            tools=self.tools,
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+        )
 
     @staticmethod
     def get_current_datetime() -> str:
@@ -39,10 +44,7 @@ class GeminiService:
         response = self.client.models.generate_content(
             model=self.model_id,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=self.tools,
-                automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
-            ),
+            config=self.config,
         )
 
         candidate = response.candidates[0]
@@ -72,10 +74,7 @@ class GeminiService:
                         candidate.content, # What Gemini asked for
                         types.Content(role="user", parts=[tool_response_part]),
                     ],
-                    config=types.GenerateContentConfig(
-                        tools=self.tools,
-                        automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
-                    ),
+                    config=self.config,
                 )
                 return follow_up.text or "Error: Gemini returned an empty response after the tool call."
 
@@ -0,0 +1,263 @@
+import datetime
+import os
+import threading
+import time
+import pytest
+from core.chat_io import (
+    HAVE_KQUEUE, WRITE_BATCH_LIMIT, HistoryTail, INotify, HistoryWriter, QueuedHistoryWriter, current_history_segment,
+    make_chat_message_filter, monitor_history_file, replay_history, segment_path,
+)
+from core.message_handler import create_message, dump_message, parse_message
+
+
+@pytest.mark.parametrize("backend", ["auto", "poll"])
+def test_monitor_history_file_sees_only_new_messages(tmp_path, backend):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_bytes(dump_message(create_message("message", "alice", "old")) + b"\n")
+    received = []
+    got_message = threading.Event()
+    stop_event = threading.Event()
+
+    def on_message_received(msg):
+        received.append(msg)
+        got_message.set()
+
+    monitor_thread = threading.Thread(
+        target=monitor_history_file,
+        args=(str(history_file), stop_event, on_message_received, 0.05, backend),
+        daemon=True
+    )
+    monitor_thread.start()
+    try:
+        # Keep appending until the monitor (which seeks to the end first) has started
+        while not got_message.wait(0.1):
+            with open(history_file, "ab") as f:
+                f.write(b"not json\n")
+                f.write(dump_message(create_message("message", "bob", "new")) + b"\n")
+    finally:
+        stop_event.set()
+        monitor_thread.join(timeout=1)
+    assert received[0]["nick"] == "bob"
+    assert received[0]["text"] == "new"
+
+
+def test_monitor_history_file_waits_for_complete_line(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_text("")
+    received = []
+    got_message = threading.Event()
+    stop_event = threading.Event()
+
+    def on_message_received(msg):
+        received.append(msg)
+        got_message.set()
+
+    monitor_thread = threading.Thread(
+        target=monitor_history_file,
+        args=(str(history_file), stop_event, on_message_received, 0.05),
+        daemon=True
+    )
+    monitor_thread.start()
+    line = dump_message(create_message("message", "bob", "split")) + b"\n"
+    try:
+        while not got_message.wait(0.1):
+            with open(history_file, "ab") as f:
+                f.write(line[:10])
+                f.flush()
+                got_message.wait(0.1)
+                f.write(line[10:])
+    finally:
+        stop_event.set()
+        monitor_thread.join(timeout=1)
+    assert received[0]["text"] == "split"
+
+
+def test_history_tail_delivers_burst_as_one_batch(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_bytes(b"")
+    batches = []
+    got_batch = threading.Event()
+    stop_event = threading.Event()
+
+    def on_messages_received(msgs):
+        batches.append(msgs)
+        got_batch.set()
+
+    history_tail = HistoryTail(str(history_file), 0.05)  # at EOF before anything is written
+    monitor_thread = threading.Thread(
+        target=history_tail.follow_batches,
+        args=(stop_event, on_messages_received),
+        daemon=True
+    )
+    monitor_thread.start()
+    try:
+        with open(history_file, "ab") as f:
+            f.write(b"".join(dump_message(create_message("message", nick, "hi")) + b"\n"
+                             for nick in ("alice", "bob", "carol")))
+        assert got_batch.wait(2)
+    finally:
+        stop_event.set()
+        monitor_thread.join(timeout=1)
+    assert [msg["nick"] for msg in batches[0]] == ["alice", "bob", "carol"]
+
+
+def test_polling_tail_stops_without_waiting_out_the_interval(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_bytes(b"")
+    stop_event = threading.Event()
+    monitor_thread = threading.Thread(
+        target=monitor_history_file,
+        args=(str(history_file), stop_event, lambda msg: None, 30, "poll"),
+        daemon=True
+    )
+    monitor_thread.start()
+    time.sleep(0.1)  # let it settle into the poll wait
+    started = time.monotonic()
+    stop_event.set()
+    monitor_thread.join(timeout=5)
+    assert not monitor_thread.is_alive()
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.parametrize("backend", ["auto", "poll"])
+def test_monitor_history_file_follows_rotation(tmp_path, backend):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_text("")
+    received = []
+    got_message = threading.Event()
+    got_rotated_message = threading.Event()
+    stop_event = threading.Event()
+
+    def on_message_received(msg):
+        received.append(msg)
+        got_message.set()
+        if msg["text"] == "after":
+            got_rotated_message.set()
+
+    monitor_thread = threading.Thread(
+        target=monitor_history_file,
+        args=(str(history_file), stop_event, on_message_received, 0.05, backend),
+        daemon=True
+    )
+    monitor_thread.start()
+    try:
+        while not got_message.wait(0.1):
+            with open(history_file, "ab") as f:
+                f.write(dump_message(create_message("message", "bob", "before")) + b"\n")
+        os.rename(history_file, tmp_path / "history.jsonl.1")
+        history_file.write_bytes(dump_message(create_message("message", "bob", "after")) + b"\n")
+        assert got_rotated_message.wait(2)
+    finally:
+        stop_event.set()
+        monitor_thread.join(timeout=1)
+    assert received[-1]["text"] == "after"
+
+
+@pytest.mark.skipif(INotify is None and not HAVE_KQUEUE, reason="needs inotify or kqueue")
+def test_monitor_history_file_wakes_on_segment_writes(tmp_path):
+    history_file = str(tmp_path / "history.jsonl")
+    current_history_segment(history_file)
+    got_message = threading.Event()
+    stop_event = threading.Event()
+    monitor_thread = threading.Thread(
+        target=monitor_history_file,
+        args=(history_file, stop_event, lambda msg: got_message.set(), 1.0),
+        daemon=True
+    )
+    monitor_thread.start()
+    writer = HistoryWriter(history_file, segmented=True)
+    try:
+        time.sleep(0.1)  # let it settle into the wait
+        writer.write_message(create_message("message", "bob", "hi"))
+        # appends land in history/<hour>.jsonl, not next to the link; no poll_interval wait
+        assert got_message.wait(0.5)
+    finally:
+        writer.close()
+        stop_event.set()
+        monitor_thread.join(timeout=2)
+
+
+def test_history_writer_refuses_segment_link_unless_segmented(tmp_path):
+    history_file = str(tmp_path / "history.jsonl")
+    current_history_segment(history_file)
+    with pytest.raises(ValueError):
+        HistoryWriter(history_file)
+
+
+def test_segment_path_is_hourly():
+    ts = datetime.datetime(2025, 1, 15, 14, 59, 59, tzinfo=datetime.timezone.utc).timestamp()
+    assert segment_path("history", ts) == os.path.join("history", "2025-01-15T14.jsonl")
+    assert segment_path("history", ts + 1) == os.path.join("history", "2025-01-15T15.jsonl")
+
+
+def test_current_history_segment_links_history_file(tmp_path):
+    history_file = str(tmp_path / "history.jsonl")
+    segment = current_history_segment(history_file)
+    assert os.path.dirname(segment) == str(tmp_path / "history")
+    assert os.path.islink(history_file)
+    assert os.path.samefile(history_file, segment)
+
+    regular_file = tmp_path / "plain.jsonl"
+    regular_file.write_text("keep me\n")
+    with pytest.raises(ValueError):
+        current_history_segment(str(regular_file))
+    assert regular_file.read_text() == "keep me\n"
+
+
+def test_history_writer_appends_lines(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_bytes(dump_message(create_message("join", "alice", "")) + b"\n")
+    writer = HistoryWriter(str(history_file))
+    writer.write_message(create_message("message", "alice", "one"))
+    writer.write(b"".join(dump_message(create_message("message", "bob", t)) + b"\n" for t in ("two", "three")))
+    writer.close()
+    writer.close()  # closing twice is harmless
+    texts = [parse_message(line)["text"] for line in history_file.read_bytes().splitlines()]
+    assert texts == ["", "one", "two", "three"]
+
+
+def test_queued_history_writer_writes_everything_in_order(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    writer = QueuedHistoryWriter(str(history_file))
+    count = WRITE_BATCH_LIMIT + 10  # more than one writev batch
+    for i in range(count):
+        if i % 2:
+            writer.write_message(create_message("message", "alice", str(i)))
+        else:
+            writer.write(dump_message(create_message("message", "bob", str(i))) + b"\n")
+    writer.close()
+    writer.close()  # closing twice is harmless
+    texts = [parse_message(line)["text"] for line in history_file.read_bytes().splitlines()]
+    assert texts == [str(i) for i in range(count)]
+    with pytest.raises(ValueError):
+        writer.write_message(create_message("message", "alice", "too late"))
+
+
+def test_chat_message_filter_drops_own_and_non_message_lines():
+    skip_line = make_chat_message_filter("gemini-bot")
+
+    def line(mtype, nick, text):
+        return dump_message(create_message(mtype, nick, text)) + b"\n"
+
+    assert not skip_line(line("message", "alice", "hi"))
+    assert not skip_line(line("message", "gemini-bot-2", "hi"))
+    assert skip_line(line("message", "gemini-bot", "hi"))
+    assert skip_line(line("join", "alice", "joined"))
+    assert skip_line(b'{"type": "message", "nick": "gemini-bot", "text": "hi"}')
+    # Text quoting the bot's nick key is escaped, so it is not mistaken for the bot
+    assert not skip_line(line("message", "alice", '"nick": "gemini-bot"'))
+
+
+def test_replay_history_yields_complete_messages_in_order(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+    history_file.write_bytes(b"")
+    assert list(replay_history(str(history_file))) == []
+
+    lines = [dump_message(create_message("message", nick, "hi")) + b"\n" for nick in ("alice", "bob", "carol")]
+    partial = dump_message(create_message("message", "dave", "still writing"))
+    history_file.write_bytes(lines[0] + b"not json\n" + lines[1] + lines[2] + partial)
+    assert [msg["nick"] for msg in replay_history(str(history_file))] == ["alice", "bob", "carol"]
+    skip_bob = lambda line: b'"bob"' in line
+    assert [msg["nick"] for msg in replay_history(str(history_file), skip_bob)] == ["alice", "carol"]
+    end = len(lines[0]) + len(b"not json\n") + len(lines[1])
+    assert [msg["nick"] for msg in replay_history(str(history_file), end=end)] == ["alice", "bob"]
@@ -0,0 +1,33 @@
+from core.message_handler import create_message, dump_message, parse_message
+from bots.echo_bot import make_echo_line_filter, make_echo_line_renderer
+
+
+def test_echo_line_matches_dump_message():
+    render_echo_line = make_echo_line_renderer("echo-bot")
+    for payload in ["hello", 'say "hi"', "tab\there", "back\\slash", "héllo ✓"]:
+        line = render_echo_line(payload)
+        assert line.endswith(b"\n")
+        parsed = parse_message(line)
+        expected = create_message("message", "echo-bot", "Echo: " + payload)
+        assert list(parsed) == list(expected)
+        assert parsed["text"] == expected["text"]
+        assert parsed["nick"] == "echo-bot"
+        assert parsed["source"] == "local"
+        # Same layout as dump_message, apart from the per-message fields
+        assert line.split(b'"ts"')[0] == dump_message(expected).split(b'"ts"')[0]
+
+
+def test_echo_line_filter_only_keeps_echo_commands_from_others():
+    skip_line = make_echo_line_filter("echo-bot")
+
+    def line(mtype, nick, text):
+        return dump_message(create_message(mtype, nick, text)) + b"\n"
+
+    assert not skip_line(line("message", "alice", "!echo hi"))
+    assert not skip_line(line("message", "echo-bot-2", "!echo hi"))
+    assert skip_line(line("message", "alice", "hello"))
+    assert skip_line(line("message", "echo-bot", "!echo hi"))
+    assert skip_line(line("join", "alice", "!echo hi"))
+    assert skip_line(b'{"type":"message","nick":"echo-bot","text":"!echo hi"}')
+    # Text quoting the bot's nick key is escaped, so it is not mistaken for the bot
+    assert not skip_line(line("message", "alice", '!echo "nick": "echo-bot"'))
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from core.message_handler import create_message, dump_message
+from bots.gemini_bot import build_batch_prompt, parse_batch_replies, unanswered_messages
+
+
+def test_batch_prompt_numbers_every_turn():
+    prompt = build_batch_prompt([("alice", "hi"), ("bob", "how are you?")])
+    assert "JSON list of 2 strings" in prompt
+    assert prompt.endswith("1. alice: hi\n2. bob: how are you?")
+
+
+def test_parse_batch_replies_strips_replies():
+    assert parse_batch_replies(json.dumps([" hello ", "fine\n"]), 2) == ["hello", "fine"]
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    json.dumps(["only one"]),  # wrong length
+    json.dumps(["one", "two", "three"]),
+    json.dumps({"replies": ["one", "two"]}),  # not a list
+    json.dumps("one, two"),
+    json.dumps(["one", 2]),  # not all strings
+    json.dumps(["one", None]),
+])
+def test_parse_batch_replies_rejects_other_shapes(text):
+    assert parse_batch_replies(text, 2) is None
+
+
+def test_unanswered_messages_starts_after_last_reply(tmp_path):
+    history_file = tmp_path / "history.jsonl"
+
+    def line(nick, text):
+        return dump_message(create_message("message", nick, text)) + b"\n"
+
+    history_file.write_bytes(line("alice", "old") + line("gemini-bot", "reply")
+                             + line("alice", "one") + line("bob", "two") + line("carol", "three"))
+    path = str(history_file)
+    assert [msg["text"] for msg in unanswered_messages(path, "gemini-bot")] == ["one", "two", "three"]
+    assert [msg["text"] for msg in unanswered_messages(path, "gemini-bot", limit=2)] == ["two", "three"]
+    end = len(history_file.read_bytes()) - len(line("carol", "three"))
+    assert [msg["text"] for msg in unanswered_messages(path, "gemini-bot", end=end)] == ["one", "two"]
+    # A bot that never replied sees the whole history, capped by limit
+    assert [msg["text"] for msg in unanswered_messages(path, "other-bot", limit=3)] == ["one", "two", "three"]
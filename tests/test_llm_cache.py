@@ -0,0 +1,64 @@
+from core.llm_cache import LLMCache, MemoryLRU, SqliteBackend, cache_key
+
+
+def test_memory_lru_evicts_least_recently_used():
+    lru = MemoryLRU(maxsize=2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    assert lru.get("a") == "1"  # "b" is now the oldest
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert lru.get("a") == "1"
+    assert lru.get("c") == "3"
+
+
+def test_sqlite_backend_persists_and_expires(tmp_path):
+    path = str(tmp_path / "cache.db")
+    backend = SqliteBackend(path)
+    backend.set("k", "hello")
+    backend.close()
+
+    reopened = SqliteBackend(path)
+    assert reopened.get("k") == "hello"
+    reopened.close()
+
+    expired = SqliteBackend(path, ttl=-1)
+    assert expired.get("k") is None
+    expired.close()
+
+
+def test_cache_only_serves_temperature_zero():
+    cache = LLMCache(MemoryLRU())
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return f"reply {len(calls)}"
+
+    assert cache.get_or_generate("m", 0, "hi", generate) == "reply 1"
+    assert cache.get_or_generate("m", 0, "hi", generate) == "reply 1"
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+    assert cache.get_or_generate("m", 0.7, "hi", generate) == "reply 2"
+    assert cache.get_or_generate("m", None, "hi", generate) == "reply 3"
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert cache_key("m", 0, "hi") != cache_key("other", 0, "hi")
+
+
+def test_system_instruction_is_part_of_the_key():
+    cache = LLMCache(MemoryLRU())
+    assert cache.get_or_generate("m", 0, "who are you?", lambda: "I am alice", system="You are alice") == "I am alice"
+    assert cache.get_or_generate("m", 0, "who are you?", lambda: "I am bob", system="You are bob") == "I am bob"
+    assert cache.get_or_generate("m", 0, "who are you?", lambda: "fresh", system="You are alice") == "I am alice"
+    assert cache_key("m", 0, "hi") != cache_key("m", 0, "hi", system="You are alice")
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    disk = SqliteBackend(str(tmp_path / "cache.db"))
+    disk.set(cache_key("m", 0, "hi"), "from disk")
+    memory = MemoryLRU()
+    cache = LLMCache(memory, disk)
+
+    assert cache.get_or_generate("m", 0, "hi", lambda: "fresh") == "from disk"
+    assert memory.get(cache_key("m", 0, "hi")) == "from disk"
+    disk.close()
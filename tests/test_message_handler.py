@@ -1,9 +1,11 @@
+import datetime
 import json
-import sys
 import os
-# Add src directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-from core.message_handler import create_message, dump_message, parse_message
+import uuid
+
+import pytest
+from core import message_handler
+from core.message_handler import create_message, dump_message, new_message_id, now_iso, parse_message
 
 
 def test_create_and_parse_message_roundtrip():
@@ -15,3 +17,75 @@ def test_create_and_parse_message_roundtrip():
     assert parsed["text"] == "hello"
     assert "ts" in parsed
     assert "id" in parsed
+
+
+def test_parse_message_accepts_utf8_bytes():
+    msg = create_message("message", "zoë", "héllo ✓")
+    parsed = parse_message(dump_message(msg) + b"\n")
+    assert parsed["nick"] == "zoë"
+    assert parsed["text"] == "héllo ✓"
+
+
+@pytest.mark.parametrize("line", [b"not json", b"[1, 2]", b'{"type": "message", "text": "no nick"}'])
+def test_parse_message_rejects_non_messages(line):
+    with pytest.raises(ValueError):
+        parse_message(line)
+
+
+@pytest.mark.parametrize("line", [
+    b'{"type":"message","nick":"alice","text":"hi"}',
+    b'{"type":"join","nick":"alice"}',  # no text/ts/id/source
+    b'{"type":"message","nick":"alice","text":null,"ts":12,"extra":[1]}',
+    b"not json",
+    b"[1, 2]",
+    b'{"type":"message"}',
+])
+def test_msgspec_and_json_paths_accept_the_same_lines(monkeypatch, line):
+    pytest.importorskip("msgspec")
+    assert message_handler._message_decoder is not None
+
+    def parse(line):
+        try:
+            return parse_message(line)
+        except ValueError:
+            return ValueError
+
+    with_msgspec = parse(line)
+    monkeypatch.setattr(message_handler, "_message_decoder", None)
+    assert parse(line) == with_msgspec
+
+
+def test_now_iso_is_current_utc_with_microseconds():
+    before = datetime.datetime.utcnow()
+    stamps = [now_iso() for _ in range(3)]
+    after = datetime.datetime.utcnow()
+    for ts in stamps:
+        assert len(ts) == len("2026-01-29T10:00:00.000000Z") and ts.endswith("Z")
+        parsed = datetime.datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%fZ")
+        assert before - datetime.timedelta(milliseconds=1) <= parsed <= after + datetime.timedelta(milliseconds=1)
+    assert stamps == sorted(stamps)
+
+
+def test_new_message_id_is_unique_uuid4():
+    ids = [new_message_id() for _ in range(1000)]  # spans several refills of the id pool
+    assert len(set(ids)) == len(ids)
+    for message_id in ids:
+        parsed = uuid.UUID(message_id)
+        assert str(parsed) == message_id
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_does_not_reuse_pooled_ids():
+    new_message_id()  # leave the rest of a batch in the parent's pool
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, new_message_id().encode())
+        os._exit(0)
+    os.close(write_fd)
+    child_id = os.read(read_fd, 64).decode()
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert child_id != new_message_id()
@@ -0,0 +1,76 @@
+import math
+
+from core.semantic_cache import SemanticCache
+
+# Stand-ins for the sentence-transformers model and hnswlib index, so the
+# cache logic runs without the optional dependencies.
+VECTORS = {
+    "hi there": (1.0, 0.0, 0.0),
+    "hello there": (0.99, 0.14, 0.0),
+    "weather?": (0.0, 1.0, 0.0),
+    "bye": (0.0, 0.0, 1.0),
+}
+
+
+class StubEncoder:
+    def encode(self, prompt, normalize_embeddings=False):
+        return VECTORS[prompt]
+
+
+class StubIndex:
+    def __init__(self):
+        self.items = {}
+        self.deleted = []
+
+    def knn_query(self, embedding, k=1):
+        def distance(label):
+            vector = self.items[label]
+            dot = sum(a * b for a, b in zip(embedding, vector))
+            return 1 - dot / (math.hypot(*embedding) * math.hypot(*vector))
+
+        label = min(self.items, key=distance)
+        return [[label]], [[distance(label)]]
+
+    def mark_deleted(self, label):
+        del self.items[label]
+        self.deleted.append(label)
+
+    def add_items(self, embeddings, labels, replace_deleted=False):
+        assert replace_deleted  # evicted slots are reused, so the index never fills up
+        for embedding, label in zip(embeddings, labels):
+            self.items[label] = embedding
+
+
+def make_cache(max_entries=10):
+    cache = SemanticCache(max_entries=max_entries)
+    cache._encoder, cache._index = StubEncoder(), StubIndex()
+    return cache
+
+
+def test_paraphrase_reuses_cached_response():
+    cache = make_cache()
+    assert cache.get_or_generate("hi there", lambda: "hello!") == "hello!"
+    assert cache.get_or_generate("hello there", lambda: "fresh") == "hello!"
+    assert cache.get_or_generate("weather?", lambda: "sunny") == "sunny"
+    assert cache.stats == {"hits": 1, "misses": 2}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.get_or_generate("hi there", lambda: "1")
+    cache.get_or_generate("weather?", lambda: "2")
+    assert cache.get_or_generate("hi there", lambda: "fresh") == "1"  # "weather?" is now the oldest
+    cache.get_or_generate("bye", lambda: "3")
+    assert cache._index.deleted == [1]
+    assert cache.get_or_generate("weather?", lambda: "4") == "4"
+    assert cache._index.deleted == [1, 0]
+
+
+def test_evicted_label_is_not_reused_for_new_entries():
+    cache = make_cache(max_entries=1)
+    cache.get_or_generate("hi there", lambda: "1")
+    cache.get_or_generate("bye", lambda: "2")
+    assert sorted(cache._index.items) == [1]  # a fresh label, not the evicted 0
+    # The index may still hand back a deleted label; that must be a miss, not a stale reply
+    cache._index.items[0] = VECTORS["hi there"]
+    assert cache.get_or_generate("hi there", lambda: "3") == "3"